@@ -1,13 +1,17 @@
 import os
-from web.main import app
 import uvicorn
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
+    # Import string (not the app object) so uvicorn can actually fork workers.
+    # Jobs live in each process' memory: WEB_WORKERS > 1 needs sticky sessions.
+    # loop/http "auto" picks uvloop + httptools when installed (uvicorn[standard]).
     uvicorn.run(
-        app,
+        "web.main:app",
         host="0.0.0.0",
         port=port,
-        workers=2,
+        workers=int(os.getenv("WEB_WORKERS", "1")),
         proxy_headers=True,
+        loop="auto",
+        http="auto",
     )
@@ -1,32 +1,46 @@
 import os
 import re
-from urllib.parse import urlparse
 import sys
 import time
 import random
 import subprocess
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Callable
+from typing import TYPE_CHECKING, List, Optional, Tuple, Callable
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tempfile
 import unicodedata
 from io import BytesIO
-try:
-    from PIL import Image  # type: ignore
-    import imagehash  # type: ignore
-    _HAS_IMAGEHASH = True
-except Exception:
-    _HAS_IMAGEHASH = False
 from dotenv import load_dotenv
-from mutagen.easyid3 import EasyID3
-from mutagen.id3 import ID3, APIC, ID3NoHeaderError
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from yt_dlp import YoutubeDL
 
+# Heavy dependencies (spotipy, yt_dlp, mutagen, PIL/imagehash) are imported
+# inside the functions that use them to keep the web server's startup light.
+if TYPE_CHECKING:
+    import spotipy
 
-SPOTIFY_URL_RE = re.compile(r"https?://open\.spotify\.com/(?:intl-[a-z]{2}/)?(track|album|playlist)/([a-zA-Z0-9]+)")
+
+# Shared HTTP session for cover art and thumbnails: keeps connections alive per host
+_HTTP = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+)
+_HTTP.mount("https://", _HTTP_ADAPTER)
+_HTTP.mount("http://", _HTTP_ADAPTER)
+_HTTP.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0 Safari/537.36",
+})
+
+# Spotify IDs are fixed-length (22 chars) base62
+SPOTIFY_URL_RE = re.compile(
+    r"^https?://open\.spotify\.com/(?:intl-[a-z]{2}/)?(track|album|playlist)/([a-zA-Z0-9]{22})(?:[/?#].*)?$"
+)
 
 
 @dataclass
@@ -39,12 +53,77 @@ class TrackMeta:
     duration_ms: Optional[int] = None
 
 
+class SpotifyRateLimiter:
+    """Token bucket for Spotify Web API calls: `refill_rate` requests per second
+    with at most `max_concurrent` requests in flight. Shared by all threads.
+    """
+
+    def __init__(self, refill_rate: float = 10.0, capacity: int = 10, max_concurrent: int = 2):
+        self.refill_rate = refill_rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_concurrent)
+
+    def acquire(self) -> None:
+        self._slots.acquire()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(float(self.capacity), self.tokens + (now - self._last) * self.refill_rate)
+                self._last = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                self._cond.wait((1.0 - self.tokens) / self.refill_rate)
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+_SPOTIFY_LIMITER = SpotifyRateLimiter()
+
+
+def _sp_call(fn: Callable, *args, max_retries: int = 5, **kwargs):
+    """Call a Spotipy method through the shared limiter, backing off on HTTP 429
+    (honoring Retry-After) with 1.5x growth capped at 60s.
+    """
+    from spotipy.exceptions import SpotifyException
+
+    backoff = 1.0
+    for attempt in range(max_retries + 1):
+        try:
+            with _SPOTIFY_LIMITER:
+                return fn(*args, **kwargs)
+        except SpotifyException as e:
+            if e.http_status != 429 or attempt >= max_retries:
+                raise
+            headers = getattr(e, "headers", None) or {}
+            try:
+                retry_after = float(headers.get("Retry-After", "1"))
+            except Exception:
+                retry_after = 1.0
+            time.sleep(min(60.0, max(retry_after, backoff)))
+            backoff = min(60.0, backoff * 1.5)
+
+
 def load_env() -> None:
     # Load .env if present
     load_dotenv()
 
 
-def get_spotify_client() -> spotipy.Spotify:
+def get_spotify_client() -> "spotipy.Spotify":
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+
     client_id = os.getenv("SPOTIFY_CLIENT_ID")
     client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
     if not client_id or not client_secret:
@@ -54,35 +133,29 @@ def get_spotify_client() -> spotipy.Spotify:
 
 
 def parse_spotify_url(url: str) -> Tuple[str, str]:
-    # Try regex first (handles optional intl-xx segment)
-    m = SPOTIFY_URL_RE.match(url)
-    if m:
-        return m.group(1), m.group(2)
-
-    # Fallback robust parsing using urllib.parse
-    try:
-        u = urlparse(url)
-        if u.netloc not in ("open.spotify.com",):
-            raise ValueError("host")
-        # Split path parts, ignoring leading '/'
-        parts = [p for p in u.path.split('/') if p]
-        # Remove optional locale segment like 'intl-es'
-        if parts and parts[0].startswith("intl-"):
-            parts = parts[1:]
-        if len(parts) < 2:
-            raise ValueError("parts")
-        kind = parts[0]
-        sid = parts[1]
-        if kind not in ("track", "album", "playlist"):
-            raise ValueError("kind")
-        # Strip any additional fragments (id might already be clean)
-        sid = sid.split('?')[0]
-        return kind, sid
-    except Exception:
+    # Handles optional intl-xx segment and trailing ?si=… / #… fragments
+    m = SPOTIFY_URL_RE.match(url.strip())
+    if not m:
         raise ValueError("URL no válida de Spotify. Debe ser track/album/playlist.")
+    return m.group(1), m.group(2)
+
 
+def _fetch_remaining_pages(fn: Callable, sid: str, first: dict, limit: int, **kwargs) -> List[dict]:
+    """Return `first` followed by every remaining page of a paginated endpoint.
+    Offsets are derived from `first["total"]` and fetched concurrently through
+    the shared rate limiter; pages are returned in offset order.
+    """
+    total = int(first.get("total") or 0)
+    start = int(first.get("offset") or 0) + int(first.get("limit") or limit)
+    offsets = range(start, total, limit)
+    if not offsets:
+        return [first]
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        rest = list(ex.map(lambda off: _sp_call(fn, sid, limit=limit, offset=off, **kwargs), offsets))
+    return [first] + rest
 
-def fetch_tracks(sp: spotipy.Spotify, kind: str, sid: str) -> List[TrackMeta]:
+
+def fetch_tracks(sp: "spotipy.Spotify", kind: str, sid: str) -> List[TrackMeta]:
     tracks: List[TrackMeta] = []
 
     def to_meta(item, track_number=None):
@@ -95,17 +168,17 @@ def fetch_tracks(sp: spotipy.Spotify, kind: str, sid: str) -> List[TrackMeta]:
         return TrackMeta(title=name, artists=artists, album=album, cover_url=cover_url, track_number=track_number, duration_ms=duration_ms)
 
     if kind == "track":
-        t = sp.track(sid)
+        t = _sp_call(sp.track, sid)
         tracks.append(to_meta(t, t.get("track_number")))
     elif kind == "album":
-        album = sp.album(sid)
+        album = _sp_call(sp.album, sid)
         album_name = album["name"]
         images = album.get("images", [])
         cover_url = images[0]["url"] if images else None
-        results = sp.album_tracks(sid, limit=50, offset=0)
-        offset = 0
-        while True:
-            for t in results["items"]:
+        # The album object already embeds the first page of tracks
+        first = album.get("tracks") or _sp_call(sp.album_tracks, sid, limit=50, offset=0)
+        for page in _fetch_remaining_pages(sp.album_tracks, sid, first, limit=50):
+            for t in page["items"]:
                 meta = TrackMeta(
                     title=t["name"],
                     artists=[a["name"] for a in t["artists"]],
@@ -115,17 +188,11 @@ def fetch_tracks(sp: spotipy.Spotify, kind: str, sid: str) -> List[TrackMeta]:
                     duration_ms=t.get("duration_ms"),
                 )
                 tracks.append(meta)
-            if results.get("next"):
-                offset += results["limit"]
-                results = sp.album_tracks(sid, limit=50, offset=offset)
-            else:
-                break
     elif kind == "playlist":
-        # Paginate through playlist items
-        results = sp.playlist_items(sid, additional_types=("track",), limit=100, offset=0)
-        offset = 0
-        while True:
-            for it in results["items"]:
+        first = _sp_call(sp.playlist_items, sid, additional_types=("track",), limit=100, offset=0)
+        pages = _fetch_remaining_pages(sp.playlist_items, sid, first, limit=100, additional_types=("track",))
+        for page in pages:
+            for it in page["items"]:
                 t = it.get("track")
                 if not t or t.get("is_local"):
                     continue
@@ -142,11 +209,6 @@ def fetch_tracks(sp: spotipy.Spotify, kind: str, sid: str) -> List[TrackMeta]:
                         duration_ms=t.get("duration_ms"),
                     )
                 )
-            if results.get("next"):
-                offset += results["limit"]
-                results = sp.playlist_items(sid, additional_types=("track",), limit=100, offset=offset)
-            else:
-                break
     else:
         print("ERROR: Tipo no soportado:", kind)
         sys.exit(1)
@@ -167,57 +229,95 @@ def ensure_ffmpeg_available():
         print("Instala ffmpeg y reinicia la terminal: https://ffmpeg.org/download.html")
 
 
-def _gather_strict_candidate_urls(meta: TrackMeta, max_results: int = 50) -> List[str]:
-    """Return ordered video URLs that strictly match title+artist.
+YT_SEARCH_RESULTS = 50
+
+_YDL_FLAT_OPTS = {
+    "quiet": True,
+    "no_warnings": True,
+    "noplaylist": True,
+    "cachedir": False,
+    "extract_flat": True,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _yt_flat_search_cached(query: str, max_results: int) -> tuple:
+    from yt_dlp import YoutubeDL
+
+    # Raises on failure so that errors are not cached. YoutubeDL keeps and
+    # mutates the params dict it is given, so each instance gets its own copy
+    with YoutubeDL(dict(_YDL_FLAT_OPTS)) as ydl:
+        info = ydl.extract_info(f"ytsearch{max_results}:{query}", download=False)
+    entries = tuple(info.get("entries", []) if info else [])
+    if not entries:
+        # Empty results are usually soft throttling; don't cache them either
+        raise LookupError(f"no results for {query!r}")
+    return entries
+
+
+# Background pool for prefetching flat searches. Searches run here and on the
+# track workers at once; each builds its own YoutubeDL on its own options copy
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ytsearch")
+
+
+def _yt_flat_search(query: str, max_results: int = YT_SEARCH_RESULTS) -> tuple:
+    """Flat YouTube search, memoized per (query, max_results) so the picker and
+    the candidate gatherer share one roundtrip per query. Returns () on error.
+    """
+    try:
+        return _yt_flat_search_cached(query, max_results)
+    except Exception:
+        return ()
+
+
+def _entry_url(e) -> Optional[str]:
+    url = e.get("webpage_url") or e.get("url")
+    if not url:
+        return None
+    if "://" not in url:
+        url = f"https://www.youtube.com/watch?v={url}"
+    return url
+
+
+def _entry_duration(e) -> Optional[float]:
+    return float(e.get("duration")) if e.get("duration") is not None else None
+
+
+def _gather_strict_candidate_urls(meta: TrackMeta, max_results: int = YT_SEARCH_RESULTS) -> List[Tuple[str, Optional[float]]]:
+    """Return ordered (video URL, duration seconds) pairs that strictly match title+artist.
     First try query "Artists - Title" then fallback to title-only query, enforcing
     that the entry contains all title tokens and at least one artist token in
-    title or channel. Uses flat extraction for speed.
+    title or channel. Reuses the cached flat searches from _yt_flat_search, and
+    skips the title-only query when the first one already matched.
     """
     target_title = _normalize_text(meta.title)
     artist_names = [_normalize_text(a) for a in meta.artists]
+    # Longest tokens first: most entries are rejects and fail fastest on them
+    target_tokens = tuple(sorted(target_title.split(), key=len, reverse=True))
+    artist_tokens = tuple(a for a in artist_names if a)
 
-    ydl_opts_flat = {
-        "quiet": True,
-        "no_warnings": True,
-        "noplaylist": True,
-        "cachedir": False,
-        "extract_flat": True,
-    }
-
-    def ytdl_search(q: str) -> list:
-        try:
-            with YoutubeDL(ydl_opts_flat) as ydl:
-                info = ydl.extract_info(f"ytsearch{max_results}:{q}", download=False)
-                return info.get("entries", []) if info else []
-        except Exception:
-            return []
-
-    def has_title_and_artist(entry) -> bool:
+    def has_title_and_artist(entry, _tt=target_tokens, _at=artist_tokens) -> bool:
         title = _normalize_text(entry.get("title") or "")
         channel = _normalize_text(entry.get("channel") or "")
-        title_ok = all(tok in title for tok in target_title.split()) if target_title else False
-        artist_ok = any(a in title or a in channel for a in artist_names if a)
+        title_ok = all(tok in title for tok in _tt) if _tt else False
+        artist_ok = any(a in title or a in channel for a in _at)
         return bool(title_ok and artist_ok)
 
-    def entry_url(e) -> Optional[str]:
-        url = e.get("webpage_url") or e.get("url")
-        if not url:
-            return None
-        if "://" not in url:
-            url = f"https://www.youtube.com/watch?v={url}"
-        return url
-
     artists_joined = ", ".join(meta.artists)
     q2 = f"{artists_joined} - {meta.title}"
     q1 = f"{meta.title}"
 
-    ordered: List[str] = []
+    ordered: List[Tuple[str, Optional[float]]] = []
+    seen: set = set()
     for q in (q2, q1):
-        for e in ytdl_search(q):
+        if ordered:
+            break
+        for e in _yt_flat_search(q, max_results):
             if has_title_and_artist(e):
-                u = entry_url(e)
-                if u and u not in ordered:
-                    ordered.append(u)
+                u = _entry_url(e)
+                if u and u not in seen:
+                    seen.add(u)
+                    ordered.append((u, _entry_duration(e)))
     return ordered
 
 
@@ -226,14 +326,22 @@ def yt_search_query(meta: TrackMeta) -> str:
     return f"{', '.join(meta.artists)} - {meta.title}"
 
 
+_PUNCT_RE = re.compile(r"[\-–—_·•·,:;!?.'\"]")
+_WS_RE = re.compile(r"\s+")
+
+
+@functools.cache
+def _combining_trans() -> dict:
+    # Maps every Unicode combining mark to None for str.translate (accent
+    # stripping); built on first use, as walking all code points takes ~70 ms
+    return dict.fromkeys(c for c in range(sys.maxunicode + 1) if unicodedata.combining(chr(c)))
+
+
+@functools.lru_cache(maxsize=4096)
 def _normalize_text(s: str) -> str:
     # Lowercase, strip accents, remove punctuation-like chars for robust matching
-    s = s.lower()
-    s = unicodedata.normalize('NFKD', s)
-    s = ''.join(c for c in s if not unicodedata.combining(c))
-    s = re.sub(r"[\-–—_·•·,:;!?.'\"]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    s = unicodedata.normalize('NFKD', s.lower()).translate(_combining_trans())
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", s)).strip()
 
 
 def _is_duration_match(target_ms: Optional[int], video_seconds: Optional[float]) -> bool:
@@ -250,32 +358,65 @@ def _is_duration_match(target_ms: Optional[int], video_seconds: Optional[float])
         return False
     return diff <= tol
 
+@functools.cache
+def _imagehash_modules():
+    # (PIL.Image, imagehash) when both are installed, else None; checked once
+    try:
+        from PIL import Image  # type: ignore
+        import imagehash  # type: ignore
+        return Image, imagehash
+    except Exception:
+        return None
+
+
 def _phash_from_url(url: str, timeout: float = 8.0):
-    if not _HAS_IMAGEHASH:
+    if _imagehash_modules() is None:
         return None
     try:
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
-        with Image.open(BytesIO(r.content)) as im:
-            im = im.convert('RGB')
-            return imagehash.phash(im)
+        return _phash_from_url_impl(url, timeout)
     except Exception:
         return None
 
 
-def _pick_best_youtube_by_title(meta: TrackMeta, max_results: int = 10, cover_url: Optional[str] = None) -> Optional[str]:
+@functools.lru_cache(maxsize=1024)
+def _phash_from_url_impl(url: str, timeout: float):
+    # ImageHash results are never mutated downstream, so sharing them is safe.
+    # Raises on failure so that errors are not cached
+    Image, imagehash = _imagehash_modules()
+    r = _HTTP.get(url, timeout=timeout)
+    r.raise_for_status()
+    with Image.open(BytesIO(r.content)) as im:
+        im = im.convert('RGB')
+        return imagehash.phash(im)
+
+
+# Striped locks so parallel workers on the same album fetch its cover once,
+# without one slow fetch blocking the covers of other albums
+_COVER_LOCKS = tuple(threading.Lock() for _ in range(16))
+
+
+def _cover_phash(cover_url: str):
+    # Spotify cover hashes live in _phash_from_url's LRU
+    with _COVER_LOCKS[hash(cover_url) % len(_COVER_LOCKS)]:
+        return _phash_from_url(cover_url, timeout=6.0)
+
+
+def _pick_best_youtube_by_title(
+    meta: TrackMeta, max_results: int = 10, cover_url: Optional[str] = None
+) -> Optional[Tuple[str, Optional[float]]]:
+    """Return (video URL, duration seconds) of the best match, or None.
+    The duration comes from the search entry and has already passed
+    _is_duration_match when present.
+    """
+    from yt_dlp import YoutubeDL
+
     target_title = _normalize_text(meta.title)
     artist_names = [_normalize_text(a) for a in meta.artists]
+    # Longest tokens first: most entries are rejects and fail fastest on them
+    target_tokens = tuple(sorted(target_title.split(), key=len, reverse=True))
+    artist_tokens = tuple(a for a in artist_names if a)
     bad_words = ["live", "cover", "karaoke", "sped up", "nightcore", "slowed", "8d", "lyrics", "lyric"]
 
-    # Flat extraction is faster and sufficient for stages 1 and 2
-    ydl_opts_flat = {
-        "quiet": True,
-        "no_warnings": True,
-        "noplaylist": True,
-        "cachedir": False,
-        "extract_flat": True,
-    }
     # Full extraction (thumbnails) only when needed (stage 3)
     ydl_opts_full = {
         "quiet": True,
@@ -285,18 +426,21 @@ def _pick_best_youtube_by_title(meta: TrackMeta, max_results: int = 10, cover_ur
     }
 
     def ytdl_search(q: str, flat: bool = True) -> list:
+        # Flat searches come from the shared cache (top max_results of the same ranking)
+        if flat:
+            return list(_yt_flat_search(q)[:max_results])
         try:
-            with YoutubeDL(ydl_opts_flat if flat else ydl_opts_full) as ydl:
+            with YoutubeDL(ydl_opts_full) as ydl:
                 info = ydl.extract_info(f"ytsearch{max_results}:{q}", download=False)
                 return info.get("entries", []) if info else []
         except Exception:
             return []
 
-    def has_title_and_artist(entry) -> Tuple[bool, bool]:
+    def has_title_and_artist(entry, _tt=target_tokens, _at=artist_tokens) -> Tuple[bool, bool]:
         title = _normalize_text(entry.get("title") or "")
         channel = _normalize_text(entry.get("channel") or "")
-        title_ok = all(tok in title for tok in target_title.split()) if target_title else False
-        artist_ok = any(a in title or a in channel for a in artist_names if a)
+        title_ok = all(tok in title for tok in _tt) if _tt else False
+        artist_ok = any(a in title or a in channel for a in _at)
         return title_ok, artist_ok
 
     def phash_best_distance(entry, spotify_hash) -> Optional[int]:
@@ -311,6 +455,8 @@ def _pick_best_youtube_by_title(meta: TrackMeta, max_results: int = 10, cover_ur
                 thumb_url = last.get('url') if isinstance(last, dict) else None
             if not thumb_url:
                 return None
+            # Thumbnail URLs are stable per video, so the bounded URL-keyed LRU
+            # also dedupes repeat candidates across tracks
             h = _phash_from_url(thumb_url, timeout=6.0)
             if h is None:
                 return None
@@ -352,39 +498,46 @@ def _pick_best_youtube_by_title(meta: TrackMeta, max_results: int = 10, cover_ur
     q_stage1 = f"{meta.title}"
     q_stage3 = q_stage2
 
+    def strict_matches(entries: list) -> list:
+        out = []
+        for e in entries:
+            t_ok, a_ok = has_title_and_artist(e)
+            # duration filter (when available)
+            dur_ok = _is_duration_match(meta.duration_ms, _entry_duration(e))
+            if t_ok and a_ok and dur_ok:
+                out.append(e)
+        return out
+
+    # Start the stage-1 search in the background while stage 2 runs here. If
+    # stage 2 matches, a prefetch that hasn't started yet is cancelled so it
+    # doesn't cost a search or hold a pool slot other tracks need.
+    f_stage1 = _SEARCH_POOL.submit(ytdl_search, q_stage1, True)
+
     # Stage 2: title + artist, require both (prefer this stage)
-    entries2 = ytdl_search(q_stage2, flat=True)
-    strict2 = []
-    for e in entries2:
-        t_ok, a_ok = has_title_and_artist(e)
-        # duration filter (when available)
-        dur_ok = _is_duration_match(meta.duration_ms, float(e.get("duration")) if e.get("duration") is not None else None)
-        if t_ok and a_ok and dur_ok:
-            strict2.append(e)
+    strict2 = strict_matches(ytdl_search(q_stage2, flat=True))
     if strict2:
         # Early exit: return immediately if we find a Topic/official audio to minimize extra work
         for e in strict2:
             title = _normalize_text(e.get("title") or "")
             channel = _normalize_text(e.get("channel") or "")
             if ("topic" in channel) or ("official audio" in title):
-                return e.get("webpage_url") or e.get("url")
+                f_stage1.cancel()
+                return e.get("webpage_url") or e.get("url"), _entry_duration(e)
         best2 = min(strict2, key=lambda e: score(e))
-        return best2.get("webpage_url") or best2.get("url")
+        f_stage1.cancel()
+        return best2.get("webpage_url") or best2.get("url"), _entry_duration(best2)
 
     # Stage 1: title only, still require artist + title
-    entries1 = ytdl_search(q_stage1, flat=True)
-    strict1 = []
-    for e in entries1:
-        t_ok, a_ok = has_title_and_artist(e)
-        dur_ok = _is_duration_match(meta.duration_ms, float(e.get("duration")) if e.get("duration") is not None else None)
-        if t_ok and a_ok and dur_ok:
-            strict1.append(e)
+    strict1 = strict_matches(f_stage1.result())
     if strict1:
         best1 = min(strict1, key=lambda e: score(e))
-        return best1.get("webpage_url") or best1.get("url")
+        return best1.get("webpage_url") or best1.get("url"), _entry_duration(best1)
 
     # Stage 3: title + artist + cover similarity enforcement
-    spotify_hash = _phash_from_url(cover_url, timeout=6.0) if cover_url else None
+    spotify_hash = _cover_phash(cover_url) if cover_url else None
+    if spotify_hash is None:
+        # Nothing to compare against: skip the expensive full extraction
+        return None
     # Need full extraction to access thumbnails reliably
     entries3 = ytdl_search(q_stage3, flat=False)
     strict3 = []
@@ -394,24 +547,144 @@ def _pick_best_youtube_by_title(meta: TrackMeta, max_results: int = 10, cover_ur
         if not (t_ok and a_ok):
             continue
         # duration guard for full extraction entries
-        dur_ok = _is_duration_match(meta.duration_ms, float(e.get("duration")) if e.get("duration") is not None else None)
+        dur_ok = _is_duration_match(meta.duration_ms, _entry_duration(e))
         if not dur_ok:
             continue
-        if spotify_hash is None:
-            continue
         best_dist = phash_best_distance(e, spotify_hash)
         if best_dist is not None and best_dist <= COVER_MAX_DIST:
             strict3.append(e)
     if strict3:
         best3 = min(strict3, key=lambda e: score(e, spotify_hash))
-        return best3.get("webpage_url") or best3.get("url")
+        return best3.get("webpage_url") or best3.get("url"), _entry_duration(best3)
 
     return None
 
 
+# MPEG audio frame header tables (kbps), indexed by bitrate index
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG1
+    2: (22050, 24000, 16000),  # MPEG2
+    0: (11025, 12000, 8000),   # MPEG2.5
+}
+
+
+def _mp3_frame_info(header: bytes) -> Tuple[int, int, int]:
+    """Parse a 4-byte MPEG audio frame header.
+    Returns (frame_size_bytes, samples_per_frame, sample_rate); raises ValueError.
+    """
+    b0, b1, b2 = header[0], header[1], header[2]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        raise ValueError("lost frame sync")
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    br_idx = b2 >> 4
+    sr_idx = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+    if version == 1 or layer == 4 or br_idx in (0, 15) or sr_idx == 3:
+        raise ValueError("unsupported frame header")
+    bitrate = _MP3_BITRATES[(1 if version == 3 else 2, layer)][br_idx] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sr_idx]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    samples = 576 if (layer == 3 and version != 3) else 1152
+    return (samples // 8) * bitrate // sample_rate + padding, samples, sample_rate
+
+
+def _fast_mp3_trim(mp3_path: str, duration_ms: int) -> None:
+    """Truncate an MP3 in place after the last frame starting before duration_ms.
+    Equivalent to `ffmpeg -t ... -c copy` without spawning a process: ID3v2 and
+    ID3v1 tags are kept as-is and a Xing/Info header (if any) gets its frame and
+    byte counts and seek TOC rebuilt. Raises ValueError if the frame stream
+    can't be parsed.
+    """
+    target_s = duration_ms / 1000.0
+    with open(mp3_path, "rb+") as f:
+        data = f.read()
+        size = len(data)
+        id3v1 = data[-128:] if size >= 128 and data[-128:-125] == b"TAG" else b""
+        audio_end = size - len(id3v1)
+
+        # Skip ID3v2 tag (syncsafe size, optional footer)
+        pos = 0
+        if data[:3] == b"ID3" and size >= 10:
+            tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+            pos = 10 + tag_size + (10 if data[5] & 0x10 else 0)
+        audio_start = pos
+
+        xing_at = None
+        frames = 0
+        frame_starts: List[int] = []  # audio frame offsets, for the Xing TOC
+        elapsed = 0.0
+        cut = None
+        while pos + 4 <= audio_end:
+            frame_size, samples, sample_rate = _mp3_frame_info(data[pos:pos + 4])
+            if pos == audio_start:
+                # A leading Xing/Info frame carries no audio
+                mono = (data[pos + 3] >> 6) == 3
+                if (data[pos + 1] >> 3) & 0x03 == 3:
+                    side = 17 if mono else 32
+                else:
+                    side = 9 if mono else 17
+                off = pos + 4 + side + (0 if data[pos + 1] & 0x01 else 2)
+                if data[off:off + 4] in (b"Xing", b"Info"):
+                    xing_at = off
+                    pos += frame_size
+                    continue
+            if elapsed >= target_s:
+                cut = pos
+                break
+            elapsed += samples / sample_rate
+            frames += 1
+            frame_starts.append(pos)
+            pos += frame_size
+
+        if cut is None:
+            # Audio already fits within the target duration
+            return
+
+        if xing_at is not None:
+            flags = int.from_bytes(data[xing_at + 4:xing_at + 8], "big")
+            field = xing_at + 8
+            if flags & 0x01:
+                f.seek(field)
+                f.write(frames.to_bytes(4, "big"))
+                field += 4
+            if flags & 0x02:
+                f.seek(field)
+                f.write((cut - audio_start).to_bytes(4, "big"))
+                field += 4
+            if flags & 0x04 and frames:
+                # Entry i: byte position of i% of the duration, scaled to 0-255
+                # of the (new) audio size; frames are equal length
+                total = cut - audio_start
+                f.seek(field)
+                f.write(bytes(
+                    min(255, (frame_starts[i * frames // 100] - audio_start) * 256 // total)
+                    for i in range(100)
+                ))
+        f.truncate(cut)
+        if id3v1:
+            f.seek(cut)
+            f.write(id3v1)
+
+
 def trim_to_spotify_duration(mp3_path: str, duration_ms: Optional[int]) -> Optional[str]:
     if not duration_ms:
         return mp3_path
+    try:
+        _fast_mp3_trim(mp3_path, duration_ms)
+        return mp3_path
+    except Exception:
+        # Unparseable frame stream: fall back to ffmpeg stream copy
+        pass
     seconds = max(0.0, duration_ms / 1000.0)
     base, _ = os.path.splitext(mp3_path)
     out_path = base + ".trim.mp3"
@@ -437,6 +710,41 @@ def trim_to_spotify_duration(mp3_path: str, duration_ms: Optional[int]) -> Optio
                 pass
         return mp3_path
 
+# Adaptive YouTube cooldown shared by all workers: set only when YouTube
+# actually throttles us (429 / anti-bot), doubling up to 5 min.
+_YT_BACKOFF_MIN = 10.0
+_YT_BACKOFF_MAX = 300.0
+_YT_COOLDOWN_LOCK = threading.Lock()
+_youtube_cooldown_until = 0.0
+_youtube_backoff = _YT_BACKOFF_MIN
+
+
+def _youtube_cooldown_wait(log: Optional[Callable[[str], None]] = None) -> None:
+    with _YT_COOLDOWN_LOCK:
+        remaining = _youtube_cooldown_until - time.monotonic()
+    if remaining > 0:
+        # The pause can last minutes; say so, or the job looks hung
+        if log:
+            try:
+                log(f"  Pausa anti-throttling: {remaining:.0f}s")
+            except Exception:
+                pass
+        time.sleep(remaining)
+
+
+def _youtube_throttled() -> None:
+    global _youtube_cooldown_until, _youtube_backoff
+    with _YT_COOLDOWN_LOCK:
+        _youtube_cooldown_until = max(_youtube_cooldown_until, time.monotonic() + _youtube_backoff)
+        _youtube_backoff = min(_YT_BACKOFF_MAX, _youtube_backoff * 2.0)
+
+
+def _youtube_recovered() -> None:
+    global _youtube_backoff
+    with _YT_COOLDOWN_LOCK:
+        _youtube_backoff = max(_YT_BACKOFF_MIN, _youtube_backoff / 2.0)
+
+
 def download_and_convert(
     meta: TrackMeta,
     out_dir: str,
@@ -450,7 +758,10 @@ def download_and_convert(
     twofactor: Optional[str] = None,
     usenetrc: bool = False,
 ) -> Optional[str]:
+    from yt_dlp import YoutubeDL
+
     ensure_ffmpeg_available()
+    _youtube_cooldown_wait(log)
 
     base_name = base_filename or sanitize_filename(f"{', '.join(meta.artists)} - {meta.title}")
     outtmpl = os.path.join(out_dir, base_name + ".%(ext)s")
@@ -499,6 +810,11 @@ def download_and_convert(
         sleep_max = float(os.getenv("SLEEP_MAX", "6.0"))
     except Exception:
         sleep_min, sleep_max = 2.5, 6.0
+    # Parallel DASH/HLS fragment fetches; capped at 8 to stay under YouTube's throttling
+    try:
+        frag_concurrency = min(8, max(1, int(os.getenv("YTDLP_FRAG_CONCURRENCY", "4"))))
+    except Exception:
+        frag_concurrency = 4
     ua_env = os.getenv("YT_UA_LIST") or ""
     if ua_env.strip():
         ua_list = [u.strip() for u in ua_env.split("||") if u.strip()]
@@ -533,9 +849,6 @@ def download_and_convert(
         },
         "default_search": "ytsearch",
         "cachedir": False,
-        "quiet": not bool(verbose),
-        "no_warnings": not bool(verbose),
-        "verbose": bool(verbose),
         "extractor_args": {
             "youtube": {
                 "player_client": yt_clients,
@@ -547,7 +860,8 @@ def download_and_convert(
         "retry_sleep_functions": {"http": "exponential_backoff"},
         "socket_timeout": 30,
         "nocheckcertificate": True,
-        "concurrent_fragment_downloads": 1,
+        "concurrent_fragment_downloads": frag_concurrency,
+        "http_chunk_size": 10 * 1024 * 1024,
         "sleep_interval": 1.5,
         "max_sleep_interval": 4.0,
         "ratelimit": rate_limit,
@@ -581,87 +895,98 @@ def download_and_convert(
             ydl_opts["twofactor"] = twofactor
 
     query = yt_search_query(meta)
-    chosen_url = _pick_best_youtube_by_title(meta, cover_url=meta.cover_url if use_cover_match else None)
-
-    # Build list of candidate URLs to try in order
-    candidates: List[str] = []
-    if chosen_url:
-        candidates.append(chosen_url)
-    for u in _gather_strict_candidate_urls(meta):
-        if u not in candidates:
-            candidates.append(u)
+    chosen = _pick_best_youtube_by_title(meta, cover_url=meta.cover_url if use_cover_match else None)
+
+    # Build list of (candidate URL, known duration) to try in order
+    candidates: List[Tuple[str, Optional[float]]] = []
+    seen: set = set()
+
+    def push(u: Optional[str], dur: Optional[float]) -> None:
+        if u and u not in seen:
+            seen.add(u)
+            candidates.append((u, dur))
+
+    if chosen:
+        push(*chosen)
+    for u, dur in _gather_strict_candidate_urls(meta):
+        push(u, dur)
     # As a last resort, allow yt-dlp to run the search query itself
     if not candidates:
-        candidates.append(query)
+        push(query, None)
     # Optional SoundCloud fallback: let yt-dlp search SoundCloud for the same query
     try:
         sc_fallback = (os.getenv("ENABLE_SOUNDCLOUD_FALLBACK", "true").strip().lower() in ("1", "true", "yes"))
         if sc_fallback:
-            candidates.append(f"scsearch10:{query}")
+            push(f"scsearch10:{query}", None)
     except Exception:
         pass
 
+    # Preflight options: same clients/region/IP as downloads, metadata only
+    info_opts = {
+        "quiet": (not verbose),
+        "no_warnings": (not verbose),
+        "verbose": bool(verbose),
+        "logger": ydl_logger,
+        "noplaylist": True,
+        "default_search": "ytsearch",
+        "cachedir": False,
+        # usar los mismos clientes para preflight
+        "extractor_args": {"youtube": {"player_client": yt_clients}},
+        "http_headers": dict(ydl_opts["http_headers"]),
+        "ratelimit": rate_limit,
+    }
+    # Carry region/IP into preflight
+    if yt_geo and len(yt_geo.strip()) == 2:
+        info_opts["geo_bypass_country"] = yt_geo.strip().upper()
+    if yt_source_addr:
+        info_opts["source_address"] = yt_source_addr
+    if yt_proxy:
+        info_opts["proxy"] = yt_proxy
+
+    def run_download(ydl, cand: str) -> Optional[str]:
+        info = ydl.extract_info(cand, download=True)
+        if "entries" in info:
+            info = info["entries"][0]
+        downloaded = ydl.prepare_filename(info)
+        mp3_path = os.path.splitext(downloaded)[0] + ".mp3"
+        if os.path.exists(mp3_path):
+            return mp3_path
+        fallback = os.path.join(out_dir, base_name + ".mp3")
+        if os.path.exists(fallback):
+            return fallback
+        return None
+
+    # One YoutubeDL per role for the whole track; User-Agent rotation goes
+    # through each instance's params instead of rebuilding it per attempt.
+    ydl_main = YoutubeDL({**ydl_opts, "http_headers": dict(ydl_opts["http_headers"])})
+    ydl_preflight = YoutubeDL(info_opts)
+    ydl_android = None  # built on first age/bot block
     try:
-        for cand in candidates:
+        for cand, vid_dur in candidates:
             used_android_retry = False
-            # Preflight: check candidate duration via metadata (no download)
-            try:
-                info_opts = {
-                    "quiet": (not verbose),
-                    "no_warnings": (not verbose),
-                    "verbose": bool(verbose),
-                    "logger": ydl_logger,
-                    "noplaylist": True,
-                    "default_search": "ytsearch",
-                    "cachedir": False,
-                    # usar los mismos clientes para preflight
-                    "extractor_args": {"youtube": {"player_client": yt_clients}},
-                    "http_headers": {
-                        "User-Agent": ua_list[0],
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                        "Accept-Language": "en-US,en;q=0.9",
-                        "Referer": "https://m.youtube.com/",
-                        "Origin": "https://m.youtube.com",
-                    },
-                    "ratelimit": rate_limit,
-                }
-                # Carry region/IP into preflight
-                if yt_geo and len(yt_geo.strip()) == 2:
-                    info_opts["geo_bypass_country"] = yt_geo.strip().upper()
-                if yt_source_addr:
-                    info_opts["source_address"] = yt_source_addr
-                if yt_proxy:
-                    info_opts["proxy"] = yt_proxy
-                with YoutubeDL(info_opts) as ydl:
-                    meta_info = ydl.extract_info(cand, download=False)
+            # Preflight: check candidate duration via metadata (no download),
+            # unless the search entry already told us the duration
+            if vid_dur is None:
+                try:
+                    meta_info = ydl_preflight.extract_info(cand, download=False)
                     if "entries" in meta_info:
                         meta_info = meta_info["entries"][0]
                     vid_dur = float(meta_info.get("duration")) if meta_info and meta_info.get("duration") is not None else None
-                    if not _is_duration_match(meta.duration_ms, vid_dur):
-                        # Skip this candidate if duration is clearly off
-                        continue
-            except Exception:
-                # If preflight fails, proceed to attempts as usual
-                pass
+                except Exception:
+                    # If preflight fails, proceed to attempts as usual
+                    pass
+            if not _is_duration_match(meta.duration_ms, vid_dur):
+                # Skip this candidate if duration is clearly off
+                continue
 
             for attempt in range(retries + 1):
                 try:
-                    ua = ua_list[attempt % len(ua_list)]
-                    opts = dict(ydl_opts)
-                    headers = dict(ydl_opts["http_headers"])
-                    headers["User-Agent"] = ua
-                    opts["http_headers"] = headers
-                    with YoutubeDL(opts) as ydl:
-                        info = ydl.extract_info(cand, download=True)
-                        if "entries" in info:
-                            info = info["entries"][0]
-                        downloaded = ydl.prepare_filename(info)
-                        mp3_path = os.path.splitext(downloaded)[0] + ".mp3"
-                        if os.path.exists(mp3_path):
-                            return mp3_path
-                        fallback = os.path.join(out_dir, base_name + ".mp3")
-                        if os.path.exists(fallback):
-                            return fallback
+                    _youtube_cooldown_wait(log)
+                    ydl_main.params["http_headers"]["User-Agent"] = ua_list[attempt % len(ua_list)]
+                    result = run_download(ydl_main, cand)
+                    if result:
+                        _youtube_recovered()
+                        return result
                 except Exception as e:
                     msg = str(e).lower()
                     # Broaden detection to cover YouTube anti-bot / verification prompts
@@ -680,6 +1005,9 @@ def download_and_convert(
                         or ("age" in msg and "restricted" in msg)
                         or any(b in msg for b in bot_checks)
                     )
+                    # Only real throttling pauses every worker
+                    if "429" in msg or "too many requests" in msg or "not a bot" in msg:
+                        _youtube_throttled()
                     # Consider Chrome DB copy error and DPAPI decryption as cookie browser failures
                     dpapi_fail = (
                         ("failed to decrypt with dpapi" in msg)
@@ -688,25 +1016,18 @@ def download_and_convert(
                     # Try Android player client first to bypass some age prompts
                     if is_age_block and not used_android_retry:
                         try:
-                            opts_android = dict(ydl_opts)
-                            opts_android["extractor_args"] = {"youtube": {"player_client": ["android"]}}
-                            ua2 = ua_list[(attempt + 1) % len(ua_list)]
-                            headers2 = dict(ydl_opts["http_headers"])
-                            headers2["User-Agent"] = ua2
-                            opts_android["http_headers"] = headers2
-                            if yt_proxy:
-                                opts_android["proxy"] = yt_proxy
-                            with YoutubeDL(opts_android) as ydl:
-                                info = ydl.extract_info(cand, download=True)
-                                if "entries" in info:
-                                    info = info["entries"][0]
-                                downloaded = ydl.prepare_filename(info)
-                                mp3_path = os.path.splitext(downloaded)[0] + ".mp3"
-                                if os.path.exists(mp3_path):
-                                    return mp3_path
-                                fallback = os.path.join(out_dir, base_name + ".mp3")
-                                if os.path.exists(fallback):
-                                    return fallback
+                            if ydl_android is None:
+                                opts_android = dict(ydl_opts)
+                                opts_android["extractor_args"] = {"youtube": {"player_client": ["android"]}}
+                                opts_android["http_headers"] = dict(ydl_opts["http_headers"])
+                                if yt_proxy:
+                                    opts_android["proxy"] = yt_proxy
+                                ydl_android = YoutubeDL(opts_android)
+                            ydl_android.params["http_headers"]["User-Agent"] = ua_list[(attempt + 1) % len(ua_list)]
+                            result = run_download(ydl_android, cand)
+                            if result:
+                                _youtube_recovered()
+                                return result
                         except Exception:
                             pass
                         finally:
@@ -730,34 +1051,34 @@ def download_and_convert(
         # move to next candidate after exhausting attempts or breaking due to age issues
         return None
     finally:
-        pass
+        ydl_main.close()
+        ydl_preflight.close()
+        if ydl_android is not None:
+            ydl_android.close()
 
 
 def embed_tags(mp3_path: str, meta: TrackMeta) -> None:
+    from mutagen.id3 import ID3, APIC, TALB, TIT2, TPE1, TRCK, ID3NoHeaderError
+
+    # Build every frame on one ID3 handle so the file is rewritten only once
     try:
-        audio = EasyID3(mp3_path)
+        tags = ID3(mp3_path)
     except ID3NoHeaderError:
-        audio = EasyID3()
-        audio.save(mp3_path)
-        audio = EasyID3(mp3_path)
+        tags = ID3()
 
-    audio["title"] = meta.title
+    tags.add(TIT2(encoding=3, text=meta.title))
     if meta.artists:
-        audio["artist"] = ", ".join(meta.artists)
+        tags.add(TPE1(encoding=3, text=", ".join(meta.artists)))
     if meta.album:
-        audio["album"] = meta.album
+        tags.add(TALB(encoding=3, text=meta.album))
     if meta.track_number:
-        audio["tracknumber"] = str(meta.track_number)
-    audio.save()
+        tags.add(TRCK(encoding=3, text=str(meta.track_number)))
 
     # Cover art
     if meta.cover_url:
         try:
-            img = requests.get(meta.cover_url, timeout=15)
+            img = _HTTP.get(meta.cover_url, timeout=15)
             img.raise_for_status()
-            with open(mp3_path, "rb+") as f:
-                pass
-            tags = ID3(mp3_path)
             mime = "image/jpeg" if meta.cover_url.lower().endswith("jpg") or meta.cover_url.lower().endswith("jpeg") else "image/png"
             tags.add(
                 APIC(
@@ -768,12 +1089,79 @@ def embed_tags(mp3_path: str, meta: TrackMeta) -> None:
                     data=img.content,
                 )
             )
-            tags.save(v2_version=3)
         except Exception:
             # Non-fatal if cover fails
             pass
 
+    # Reserve 2 KB of padding when the tag grows so later edits don't shift audio
+    tags.save(mp3_path, v2_version=3, padding=lambda info: info.padding if info.padding >= 0 else 2048)
+
+
+def _process_one_track(
+    idx: int,
+    total: int,
+    t: TrackMeta,
+    container_dir: str,
+    kind: str,
+    trim_to_spotify: bool,
+    log: Callable[[str], None],
+    verbose: bool = False,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    twofactor: Optional[str] = None,
+    usenetrc: bool = False,
+) -> Tuple[str, Optional[str]]:
+    """Download, tag and optionally trim a single track.
+    Returns (display_name, mp3_path) where mp3_path is None on failure.
+    """
+    # Build base filename with prefix
+    prefix = None
+    if kind == "album" and t.track_number:
+        prefix = f"{t.track_number:02d} "
+    elif kind == "playlist":
+        prefix = f"{idx:02d} "
+
+    display_name = f"{', '.join(t.artists)} - {t.title}"
+    base_filename = sanitize_filename((prefix or "") + display_name)
+
+    log(f"[{idx}/{total}] {display_name}")
+    # Per-track logger so interleaved lines from parallel workers stay attributable
+    def track_log(msg: str) -> None:
+        log(f"[{idx}] {msg}")
+
+    # Use cover-art matching only for albums/tracks (not playlists)
+    use_cover = kind in ("album", "track")
+    try:
+        mp3_path = download_and_convert(
+            t,
+            container_dir,
+            base_filename=base_filename,
+            use_cover_match=use_cover,
+            verbose=verbose,
+            log=track_log,
+            username=username,
+            password=password,
+            twofactor=twofactor,
+            usenetrc=usenetrc,
+        )
+        if not mp3_path:
+            # stop processing this track immediately and record failure
+            track_log("  Saltado: descarga fallida")
+            return display_name, None
 
+        # success path: tag, then optional trim
+        embed_tags(mp3_path, t)
+        if trim_to_spotify:
+            if verbose and t.duration_ms:
+                track_log(f"  Recortando a {t.duration_ms/1000.0:.2f}s (Spotify)…")
+            trim_to_spotify_duration(mp3_path, t.duration_ms)
+    except Exception as e:
+        # One broken track must not abort the others; report it as a failure
+        track_log(f"  Saltado: {e}")
+        return display_name, None
+    # Marks the end of this track for callers following interleaved workers
+    track_log("  Completado")
+    return display_name, mp3_path
 
 
 def process_url(
@@ -786,6 +1174,7 @@ def process_url(
     password: Optional[str] = None,
     twofactor: Optional[str] = None,
     usenetrc: bool = False,
+    concurrent_downloads: Optional[int] = None,
 ) -> None:
     os.makedirs(out_dir, exist_ok=True)
     load_env()
@@ -796,73 +1185,66 @@ def process_url(
     # Determine container subfolder for album/playlist
     container_dir = out_dir
     if kind == "album":
-        alb = sp.album(sid)
+        alb = _sp_call(sp.album, sid)
         container_name = sanitize_filename(alb.get("name", "album"))
         container_dir = os.path.join(out_dir, container_name)
     elif kind == "playlist":
-        pl = sp.playlist(sid, fields="name")
+        pl = _sp_call(sp.playlist, sid, fields="name")
         container_name = sanitize_filename(pl.get("name", "playlist"))
         container_dir = os.path.join(out_dir, container_name)
 
     if container_dir != out_dir:
         os.makedirs(container_dir, exist_ok=True)
 
-    log(f"Encontradas {len(tracks)} pistas para descargar…")
-    if verbose:
-        log(f"Destino: {container_dir}")
-
-    failures = []  # collect failed items to report at the end
-
-    for idx, t in enumerate(tracks, start=1):
-        # Build base filename with prefix
-        prefix = None
-        if kind == "album" and t.track_number:
-            prefix = f"{t.track_number:02d} "
-        elif kind == "playlist":
-            prefix = f"{idx:02d} "
-
-        display_name = f"{', '.join(t.artists)} - {t.title}"
-        base_filename = sanitize_filename((prefix or "") + display_name)
+    # Serialize calls to the caller's logger: workers log from several threads
+    log_lock = threading.Lock()
 
-        log(f"[{idx}/{len(tracks)}] {display_name}")
-        # Use cover-art matching only for albums/tracks (not playlists)
-        use_cover = kind in ("album", "track")
-        mp3_path = download_and_convert(
-            t,
-            container_dir,
-            base_filename=base_filename,
-            use_cover_match=use_cover,
-            verbose=verbose,
-            log=log,
-            username=username,
-            password=password,
-            twofactor=twofactor,
-            usenetrc=usenetrc,
-        )
-        if not mp3_path:
-            # stop processing this track immediately and record failure
-            log("  Saltado: descarga fallida")
-            failures.append(display_name)
-            continue
+    def safe_log(msg: str) -> None:
+        with log_lock:
+            log(msg)
 
-        # success path: tag, then optional trim
-        embed_tags(mp3_path, t)
-        if trim_to_spotify:
-            if verbose and t.duration_ms:
-                log(f"  Recortando a {t.duration_ms/1000.0:.2f}s (Spotify)…")
-            trim_to_spotify_duration(mp3_path, t.duration_ms)
+    safe_log(f"Encontradas {len(tracks)} pistas para descargar…")
+    if verbose:
+        safe_log(f"Destino: {container_dir}")
 
-        # Delay between tracks to avoid anti-bot/rate limiting
+    if concurrent_downloads is None:
         try:
-            time.sleep(8.0)
+            concurrent_downloads = int(os.getenv("CONCURRENT_DOWNLOADS", "3"))
         except Exception:
-            pass
+            concurrent_downloads = 3
+    workers = max(1, concurrent_downloads)
+
+    failures: List[Tuple[int, str]] = []  # collect failed items to report at the end
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _process_one_track,
+                idx,
+                len(tracks),
+                t,
+                container_dir,
+                kind,
+                trim_to_spotify,
+                safe_log,
+                verbose,
+                username,
+                password,
+                twofactor,
+                usenetrc,
+            ): idx
+            for idx, t in enumerate(tracks, start=1)
+        }
+        for fut in as_completed(futures):
+            display_name, mp3_path = fut.result()
+            if not mp3_path:
+                with log_lock:
+                    failures.append((futures[fut], display_name))
 
     # Print only failures at the end
     if failures:
-        log("\nResumen: pistas que fallaron")
-        for name in failures:
-            log(f" - {name}")
+        safe_log("\nResumen: pistas que fallaron")
+        for _, name in sorted(failures):
+            safe_log(f" - {name}")
 
 
 # CLI removido: este módulo ahora se usa como librería desde la app web.
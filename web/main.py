@@ -1,14 +1,22 @@
 import os
-import uuid
+import secrets
 import shutil
 import re
-from datetime import datetime
+import functools
+import itertools
+import io
+import zipfile
+from datetime import datetime, timezone
 import sys
+import time
 import asyncio
-from typing import Optional, Tuple, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple, Dict, Deque, List
 
 from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -20,15 +28,51 @@ if PROJECT_ROOT not in sys.path:
 from spotify_to_mp3 import process_url
 DOWNLOADS_DIR = os.path.join(PROJECT_ROOT, "downloads")
 
-app = FastAPI(title="Spotify to MP3 Web")
+# Log line patterns, shared by all jobs
+# Track header emitted by process_url, e.g. "[3/15] Artist - Title"
+RE_TRACK = re.compile(r"\[(\d{1,6})/(\d{1,6})\]\s(.{1,512})")
+# Status lines always shown in the minimal (non-verbose) console
+EMIT_PREFIXES = ("Preparando…", "Encontradas ", "Destino:", "Descargando…")
+# Per-track tag added by parallel workers, e.g. "[3] WARN: ..."
+RE_WORKER_TAG = re.compile(r"\[(\d{1,6})\]\s+")
+# Diagnostic lines kept in the non-verbose job log file
+RE_KEEP_LOG = re.compile(r"\[youtube\]|ERROR:|WARN:|\[cookies\]")
+# YouTube anti-bot prompt, straight or typographic apostrophe
+BOT_HINT_RE = re.compile(r"confirm you['’]re not a bot", re.IGNORECASE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Process-wide setup, done once instead of per job/request
+    # Ensure ffmpeg is discoverable if a local folder exists next to project root
+    local_ffmpeg = os.path.join(PROJECT_ROOT, "ffmpeg")
+    path = os.environ.get("PATH", "")
+    if os.path.isdir(local_ffmpeg) and local_ffmpeg not in path.split(os.pathsep):
+        os.environ["PATH"] = local_ffmpeg + os.pathsep + path
+    app.state.ffmpeg = shutil.which("ffmpeg")
+    # Jobs run process_url on this pool; its size caps concurrent jobs per process.
+    # Jobs share the GIL, which a free-threaded (3.13t+) interpreter lifts.
+    app.state.dl_executor = ThreadPoolExecutor(
+        max_workers=int(os.environ.get("SPOTDL_WORKERS", "8")),
+        thread_name_prefix="dl",
+    )
+    sweeper = asyncio.create_task(evict_finished_jobs())
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        app.state.dl_executor.shutdown(wait=False, cancel_futures=True)
+
+# orjson serializes the polled /status payload in C
+app = FastAPI(title="Spotify to MP3 Web", lifespan=lifespan, default_response_class=ORJSONResponse)
 app.mount("/static", StaticFiles(directory=os.path.join(APP_ROOT, "static")), name="static")
 templates = Jinja2Templates(directory=os.path.join(APP_ROOT, "templates"))
 
 class Job:
     def __init__(self, url: str, out_dir: str, trim: bool, verbose: bool,
                  username: Optional[str] = None, password: Optional[str] = None,
-                 twofactor: Optional[str] = None, usenetrc: bool = False):
-        self.id = str(uuid.uuid4())
+                 twofactor: Optional[str] = None, usenetrc: bool = False,
+                 id: Optional[str] = None):
+        self.id = id or secrets.token_hex(12)
         self.url = url
         self.out_dir = out_dir
         self.trim = trim
@@ -38,15 +82,34 @@ class Job:
         self.password = password
         self.twofactor = twofactor
         self.usenetrc = usenetrc
-        self.created_at = datetime.utcnow()
+        self.created_at = datetime.now(timezone.utc)
+        # Formatted once; to_dict() runs on every /status poll
+        self.created_at_iso = self.created_at.isoformat().replace("+00:00", "Z")
         self.returncode: Optional[int] = None
-        self.logs: asyncio.Queue[str] = asyncio.Queue()
+        self.finished_at: Optional[float] = None  # time.monotonic() when returncode was set
+        # Log lines appended from the worker thread, drained in batches by the SSE
+        # generator; log_ready is set once per batch instead of once per line
+        self.log_buf: Deque[str] = deque()
+        self.log_ready = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
         self.output_file: Optional[str] = None
         self.current_title: Optional[str] = None
         self.current_index: Optional[int] = None
         self.total: Optional[int] = None
         self.last_status: Optional[str] = None  # downloading|skipped|error|done
 
+    def push_log(self, line: str) -> None:
+        # Safe from any thread
+        self.log_buf.append(line)
+        if not self.log_ready.is_set():
+            self._loop.call_soon_threadsafe(self.log_ready.set)
+
+    def drain_logs(self) -> List[str]:
+        lines = []
+        while self.log_buf:
+            lines.append(self.log_buf.popleft())
+        return lines
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -54,7 +117,7 @@ class Job:
             "out_dir": self.out_dir,
             "trim": self.trim,
             "verbose": self.verbose,
-            "created_at": self.created_at.isoformat() + "Z",
+            "created_at": self.created_at_iso,
             "running": self.returncode is None,
             "returncode": self.returncode,
             "output_file": self.output_file,
@@ -65,189 +128,286 @@ class Job:
         }
 
 JOBS: Dict[str, Job] = {}
+# Finished jobs (and their output folders) are dropped after this many seconds
+JOB_TTL_SECONDS = 3600
+JOB_SWEEP_INTERVAL = 60
+
+async def evict_finished_jobs():
+    # Only touched from the event loop; entries are popped before any await so
+    # request handlers never see a half-removed job.
+    while True:
+        await asyncio.sleep(JOB_SWEEP_INTERVAL)
+        now = time.monotonic()
+        expired = [
+            JOBS.pop(job_id)
+            for job_id, job in list(JOBS.items())
+            if job.finished_at is not None and now - job.finished_at > JOB_TTL_SECONDS
+        ]
+        for job in expired:
+            await asyncio.to_thread(shutil.rmtree, job.out_dir, True)
 
 # Helpers
 
+@functools.cache
 def python_exec() -> str:
     # Prefer venv python if present
     venv_py = os.path.join(PROJECT_ROOT, ".venv", "Scripts", "python.exe")
     return venv_py if os.path.exists(venv_py) else "python"
 
+# Idle time before a keep-alive comment; proxies typically drop SSE after ~30s
+SSE_HEARTBEAT_SECONDS = 15.0
+
+def _find_mp3s(root: str) -> List[str]:
+    # scandir exposes the entry type from the directory listing, no extra stat
+    stack = [root]
+    out: List[str] = []
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    elif e.name[-4:].lower() == ".mp3":
+                        out.append(e.path)
+        except OSError:
+            continue
+    return out
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable sink for ZipFile; chunks are drained by the caller."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def iter_zip_dir(root: str, chunk_size: int = 1 << 20):
+    # Yield a ZIP of `root` as it is built. MP3 is already compressed, so entries
+    # are stored; StreamingResponse runs this sync generator in a worker thread.
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for dirpath, _, files in os.walk(root):
+            for fn in sorted(files):
+                path = os.path.join(dirpath, fn)
+                info = zipfile.ZipInfo.from_file(path, os.path.relpath(path, root))
+                info.compress_type = zipfile.ZIP_STORED
+                with open(path, "rb") as src, zf.open(info, "w") as dst:
+                    while True:
+                        chunk = src.read(chunk_size)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        yield sink.drain()
+                yield sink.drain()
+    yield sink.drain()
+
 async def sse_event_generator(job: Job):
-    # Stream logs until job finishes and queue drains
+    # Stream logs until job finishes and queue drains. Wakes only on new lines,
+    # job completion (run_job sets log_ready) or an idle heartbeat.
     while True:
-        if job.returncode is not None and job.logs.empty():
+        if job.returncode is not None and not job.log_buf:
             break
         try:
-            line = await asyncio.wait_for(job.logs.get(), timeout=0.5)
-            yield f"data: {line}\n\n"
+            await asyncio.wait_for(job.log_ready.wait(), timeout=SSE_HEARTBEAT_SECONDS)
         except asyncio.TimeoutError:
             # heartbeat
             yield f": keep-alive\n\n"
+            continue
+        # Clear before draining so lines appended meanwhile re-arm the event
+        job.log_ready.clear()
+        lines = job.drain_logs()
+        if lines:
+            # One SSE event per batch (multi-line data field)
+            yield "".join(f"data: {ln}\n" for ln in lines) + "\n"
+
+def should_emit_minimal(line: str) -> bool:
+    s = line.strip()
+    return (
+        s.startswith(EMIT_PREFIXES) or "Saltado" in s or "Pausa anti-throttling" in s
+        or RE_TRACK.match(s) is not None
+    )
+
+def _keep_log_line(ln: str) -> bool:
+    # Filter noisy debug lines for non-verbose job logs
+    s = RE_WORKER_TAG.sub("", ln.strip(), count=1)
+    # [debug]/[info] never match either check; keep minimal status lines
+    return RE_KEEP_LOG.match(s) is not None or should_emit_minimal(s)
+
+def _write_final_log(log_path: str, lines, verbose: bool) -> None:
+    try:
+        kept = lines if verbose else filter(_keep_log_line, lines)
+        with open(log_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            f.writelines(ln + "\n" for ln in kept)
+    except Exception:
+        pass
 
 async def run_job(job: Job):
     os.makedirs(job.out_dir, exist_ok=True)
-    await job.logs.put("Preparando…\n")
+    job.push_log("Preparando…")
 
-    # patterns
-    re_track = re.compile(r"^\[(\d+)/(\d+)\]\s+(.+)$")
     downloading_announced = False
-    loop = asyncio.get_running_loop()
-
-    # Ensure ffmpeg is discoverable if a local folder exists next to project root
-    local_ffmpeg = os.path.join(PROJECT_ROOT, "ffmpeg")
-    if os.path.isdir(local_ffmpeg):
-        os.environ["PATH"] = local_ffmpeg + os.pathsep + os.environ.get("PATH", "")
 
     # Cookies now are provided explicitly via cookiefile upload o cookies-from-browser.
 
-    all_lines: list[str] = []
+    # Bounded so a runaway verbose job can't exhaust memory
+    all_lines: Deque[str] = deque(maxlen=20_000)
+    # Lines ever appended to all_lines; positions below are in this count
+    lines_total = 0
     error_seen = False
     skipped_seen = False
-    # Per-track log buffer
-    current_track_log: list[str] = []
+    # Tracks in flight by index -> (title, position of its header). Workers run
+    # several at once, so the status reports the oldest one still running
+    running: Dict[int, Tuple[str, int]] = {}
+    # Running tracks that skipped or errored; each one's log is written once
+    # when it finishes (or the job ends)
+    failed_tracks: set = set()
+
+    def add_line(line: str) -> None:
+        nonlocal lines_total
+        all_lines.append(line)
+        lines_total += 1
+
+    def track_lines(idx: int, start: int) -> list:
+        # The track's header at position start plus the lines its worker tagged
+        # after it (other workers interleave), minus any the deque dropped
+        first = lines_total - len(all_lines)
+        tag = f"[{idx}] "
+        lines = [all_lines[start - first]] if start >= first else []
+        lines.extend(
+            ln for ln in itertools.islice(all_lines, max(start + 1, first) - first, None)
+            if ln.startswith(tag)
+        )
+        return lines
 
     def sanitize_filename(name: str) -> str:
         return re.sub(r"[\\/:*?\"<>|]", "_", name).strip() or "track"
 
-    def should_emit_minimal(line: str) -> bool:
-        s = line.strip()
-        if s.startswith("Preparando…"):
-            return True
-        if s.startswith("Encontradas "):
-            return True
-        if s.startswith("Destino:"):
-            return True
-        if re_track.match(s):
-            return True
-        if s.startswith("Descargando…"):
-            return True
-        if s.startswith("Descargado") or "Saltado" in s:
-            return True
-        return False
+    def flush_track_log(title: str, lines: list) -> None:
+        try:
+            fname = f"{sanitize_filename(title)}.log.txt"
+            with open(os.path.join(job.out_dir, fname), "w", encoding="utf-8") as f:
+                f.writelines(ln + "\n" for ln in lines)
+        except Exception:
+            pass
 
     seen_hints = {"bot_check": False}
 
     def log_cb(message: str):
+        # Runs on the download worker thread, so file writes here don't block the loop
+        nonlocal downloading_announced, error_seen, skipped_seen
+        mline = message.rstrip("\n")
         # Push log line to async queue from worker thread
         try:
-            mline = message.rstrip("\n")
-            all_lines.append(mline)
-            # append to current track buffer as well
-            current_track_log.append(mline)
+            add_line(mline)
             if job.verbose or should_emit_minimal(mline):
-                loop.call_soon_threadsafe(asyncio.create_task, job.logs.put(mline + "\n"))
+                job.push_log(mline)
         except Exception:
             pass
         # Update status heuristics
-        stripped = message.strip()
-        m = re_track.match(stripped)
+        stripped = mline.strip()
+        m = RE_TRACK.match(stripped)
         if m:
             try:
-                job.current_index = int(m.group(1))
+                # The header itself is the last line added
+                running[int(m.group(1))] = (m.group(3), lines_total - 1)
                 job.total = int(m.group(2))
             except Exception:
                 pass
-            job.current_title = m.group(3)
-            # Reset per-track buffer starting at the track header
-            current_track_log.clear()
-            current_track_log.append(stripped)
+            job.current_index = min(running)
+            job.current_title = running[job.current_index][0]
             job.last_status = "downloading"
-            nonlocal downloading_announced
             if not downloading_announced:
                 try:
                     # Always show 'Descargando…' in mini console
-                    loop.call_soon_threadsafe(asyncio.create_task, job.logs.put("Descargando…\n"))
+                    job.push_log("Descargando…")
                 except Exception:
                     pass
                 downloading_announced = True
             return
         low = stripped.lower()
+        w = RE_WORKER_TAG.match(stripped)
+        idx = int(w.group(1)) if w else None
         if "saltado" in low or "skip" in low:
             job.last_status = "skipped"
             skipped_seen = True
-            # Write per-track log immediately for skipped track
-            try:
-                if job.current_title:
-                    fname = f"{sanitize_filename(job.current_title)}.log.txt"
-                    with open(os.path.join(job.out_dir, fname), "w", encoding="utf-8") as f:
-                        for ln in current_track_log:
-                            f.write(ln + "\n")
-            except Exception:
-                pass
+            if idx in running:
+                failed_tracks.add(idx)
         elif low.startswith("error:") or " error" in low:
             job.last_status = "error"
             error_seen = True
-            # Write per-track log immediately for error
-            try:
-                if job.current_title:
-                    fname = f"{sanitize_filename(job.current_title)}.log.txt"
-                    with open(os.path.join(job.out_dir, fname), "w", encoding="utf-8") as f:
-                        for ln in current_track_log:
-                            f.write(ln + "\n")
-            except Exception:
-                pass
+            if idx in running:
+                failed_tracks.add(idx)
+        if w and stripped.startswith(("Completado", "Saltado"), w.end()) and idx in running:
+            # Track finished: write its log if it failed, and move the status
+            # on to the oldest one still running
+            title, start = running.pop(idx)
+            if idx in failed_tracks:
+                failed_tracks.discard(idx)
+                flush_track_log(title, track_lines(idx, start))
+            if running:
+                job.current_index = min(running)
+                job.current_title = running[job.current_index][0]
         # Friendly hints (emit once per job)
-        if ("sign in to confirm you’re not a bot" in low or "confirm you're not a bot" in low) and not seen_hints["bot_check"]:
+        if not seen_hints["bot_check"] and BOT_HINT_RE.search(stripped):
             seen_hints["bot_check"] = True
             hint = "Hint: YouTube exige verificación anti-bot. Si aparece este aviso, reintenta más tarde o inicia sesión en YouTube en tu navegador."
-            all_lines.append(hint)
+            # Tagged in the job lines so it lands in the track's own log
+            add_line(f"[{idx}] {hint}" if idx is not None else hint)
             try:
-                loop.call_soon_threadsafe(asyncio.create_task, job.logs.put(hint + "\n"))
+                job.push_log(hint)
             except Exception:
                 pass
 
     try:
-        await asyncio.to_thread(
-            process_url,
-            job.url,
-            job.out_dir,
-            job.trim,
-            log_cb,
-            job.verbose,
-            # auth
-            job.username,
-            job.password,
-            job.twofactor,
-            job.usenetrc,
+        await asyncio.get_running_loop().run_in_executor(
+            app.state.dl_executor,
+            functools.partial(
+                process_url,
+                job.url,
+                job.out_dir,
+                job.trim,
+                log_cb,
+                job.verbose,
+                # auth
+                job.username,
+                job.password,
+                job.twofactor,
+                job.usenetrc,
+            ),
         )
         job.returncode = 0
         job.last_status = "done"
     except Exception as e:
         err = f"ERROR: {e}"
-        all_lines.append(err)
+        add_line(err)
         if job.verbose:
-            await job.logs.put(err + "\n")
+            job.push_log(err)
         job.returncode = 1
         job.last_status = "error"
+    job.finished_at = time.monotonic()
+    # Wake SSE listeners so they notice completion without waiting for a heartbeat
+    job.log_ready.set()
 
-    # Write log file on error or skipped items
-    try:
-        if job.returncode != 0 or error_seen or skipped_seen:
-            log_path = os.path.join(job.out_dir, f"job_{job.id}.log.txt")
-            # Filter noisy debug lines if not verbose
-            def keep_line(ln: str) -> bool:
-                if job.verbose:
-                    return True
-                s = ln.strip()
-                if s.startswith("[debug]"):
-                    return False
-                if s.startswith("[info]"):
-                    return False
-                if s.startswith("[youtube]"):
-                    return True
-                if s.startswith("ERROR:") or s.startswith("WARN:"):
-                    return True
-                if s.startswith("[cookies]"):
-                    return True
-                # keep minimal status lines
-                return should_emit_minimal(s)
-            with open(log_path, "w", encoding="utf-8") as f:
-                for ln in all_lines:
-                    if keep_line(ln):
-                        f.write(ln + "\n")
-    except Exception:
-        pass
+    # Logs of failed tracks that never finished (job aborted mid-track)
+    for idx in failed_tracks:
+        title, start = running[idx]
+        await asyncio.to_thread(flush_track_log, title, track_lines(idx, start))
+
+    # Write log file on error or skipped items, off the event loop
+    if job.returncode != 0 or error_seen or skipped_seen:
+        log_path = os.path.join(job.out_dir, f"job_{job.id}.log.txt")
+        await asyncio.to_thread(_write_final_log, log_path, all_lines, job.verbose)
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -265,12 +425,11 @@ async def start_job(
     twofactor: Optional[str] = Form(None),
     usenetrc: Optional[bool] = Form(False),
 ):
-    # Per-job output folder to isolate artifacts
-    job_temp = Job(url=url.strip(), out_dir="", trim=bool(trim), verbose=bool(verbose))
-    job_id = job_temp.id
+    # Per-job output folder to isolate artifacts, named after the job id
+    job_id = secrets.token_hex(12)
     out_dir = os.path.join(DOWNLOADS_DIR, f"job_{job_id}")
-    # Pre-create job to get id and out dir
     job = Job(
+        id=job_id,
         url=url.strip(),
         out_dir=out_dir,
         trim=bool(trim),
@@ -296,7 +455,12 @@ async def logs(job_id: str):
     job = JOBS.get(job_id)
     if not job:
         raise HTTPException(404, "Job no encontrado")
-    return StreamingResponse(sse_event_generator(job), media_type="text/event-stream")
+    return StreamingResponse(
+        sse_event_generator(job),
+        media_type="text/event-stream",
+        # Keep proxies (nginx) from buffering frames
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/download/{job_id}")
 async def download(job_id: str):
@@ -308,33 +472,45 @@ async def download(job_id: str):
         raise HTTPException(409, "El job aún está en ejecución")
     # Collect mp3 files inside this job folder
     target_dir = job.out_dir if os.path.isdir(job.out_dir) else DOWNLOADS_DIR
-    mp3s = []
-    for root, _, files in os.walk(target_dir):
-        for fn in files:
-            if fn.lower().endswith('.mp3'):
-                mp3s.append(os.path.join(root, fn))
+    mp3s = _find_mp3s(target_dir)
     if not mp3s:
         raise HTTPException(404, "No hay MP3 generados para este job")
     if len(mp3s) == 1:
         # Return the single MP3 directly
         single = mp3s[0]
         fname = os.path.basename(single)
-        return FileResponse(single, filename=fname)
-    # Otherwise zip only this job folder
-    zpath = os.path.join(DOWNLOADS_DIR, f"job_{job.id}.zip")
-    base = os.path.splitext(zpath)[0]
-    if os.path.exists(zpath):
-        os.remove(zpath)
-    shutil.make_archive(base, "zip", target_dir)
-    return FileResponse(zpath, filename=f"spotify_mp3_{job.id}.zip")
+        # Explicit media_type skips mimetype guessing; Starlette streams the file in chunks
+        return FileResponse(
+            single,
+            filename=fname,
+            media_type="audio/mpeg",
+            headers={"Cache-Control": "private, max-age=300"},
+        )
+    # Otherwise stream a zip of this job folder, built on the fly
+    return StreamingResponse(
+        iter_zip_dir(target_dir),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="spotify_mp3_{job.id}.zip"'},
+    )
 
 @app.get("/api/ffmpeg")
 async def ffmpeg_check():
-    from shutil import which
-    return JSONResponse({"ffmpeg": which("ffmpeg") is not None})
+    return ORJSONResponse({"ffmpeg": app.state.ffmpeg is not None})
 
  
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    # uvloop + httptools are picked automatically when installed (not on Windows).
+    # JOBS lives in process memory: only raise WEB_WORKERS behind sticky sessions
+    # or after moving the registry to a shared store, otherwise /status, /logs and
+    # /download 404 on workers that didn't start the job.
+    uvicorn.run(
+        "main:app",
+        host="127.0.0.1",
+        port=8000,
+        loop="auto",
+        http="httptools",
+        workers=int(os.environ.get("WEB_WORKERS", "1")),
+        reload=False,
+    )